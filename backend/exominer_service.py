@@ -6,8 +6,12 @@ Gère le lancement et l'analyse des résultats ExoMiner via Docker
 import subprocess
 import os
 import pandas as pd
+import queue
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 import logging
 import uuid
@@ -27,6 +31,43 @@ except ImportError:
 IMAGE_NAME = "ghcr.io/nasa/exominer:amd64"
 EXOMINER_WORK_DIR = "exominer_work"
 
+
+def _pump_process_output(process):
+    """
+    Itère sur les lignes de sortie d'un process via un thread lecteur.
+    Lit par blocs de 64 Ko avec os.read au lieu d'un readline() bloquant
+    par ligne: moins de syscalls et pas de contre-pression sur le PIPE
+    quand ExoMiner loggue massivement.
+    """
+    lines_queue = queue.Queue()
+
+    def reader():
+        fd = process.stdout.fileno()
+        pending = b''
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                break
+            if not chunk:
+                break
+            pending += chunk
+            if b'\n' in pending:
+                complete, pending = pending.rsplit(b'\n', 1)
+                lines_queue.put(complete.decode('utf-8', errors='replace').splitlines())
+        if pending:
+            lines_queue.put(pending.decode('utf-8', errors='replace').splitlines())
+        lines_queue.put(None)
+
+    threading.Thread(target=reader, daemon=True).start()
+
+    while True:
+        batch = lines_queue.get()
+        if batch is None:
+            break
+        for line in batch:
+            yield line.strip()
+
 class ExoMinerService:
     """Service pour gérer les analyses ExoMiner"""
     
@@ -328,40 +369,35 @@ class ExoMinerService:
             logger.info(f"Lancement ExoMiner: {analysis_id}")
             logger.info(f"Commande: {' '.join(cmd)}")
             
-            # Exécution avec logs et progression
+            # Exécution avec logs et progression (sortie pompée par un
+            # thread lecteur, voir _pump_process_output)
             process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
+                bufsize=-1
             )
-            
+
             # Capturer les logs et estimer la progression
             output_lines = []
             progress = 0
             total_tics = metadata.get('info', {}).get('total_tics', 1)
-            
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    line = output.strip()
-                    output_lines.append(line)
-                    logger.info(f"[ExoMiner] {line}")
-                    
-                    # Estimation de la progression basée sur les logs
-                    if 'Processing TIC' in line or 'Analyzing' in line:
-                        progress = min(progress + (80 / total_tics), 80)
-                    elif 'Generating catalog' in line or 'Writing results' in line:
-                        progress = 90
-                    
-                    # Mettre à jour la progression toutes les 10 lignes
-                    if len(output_lines) % 10 == 0:
-                        metadata['progress'] = int(progress)
-                        with open(metadata_path, 'w') as f:
-                            json.dump(metadata, f, indent=2)
+
+            for line in _pump_process_output(process):
+                output_lines.append(line)
+                logger.info(f"[ExoMiner] {line}")
+
+                # Estimation de la progression basée sur les logs
+                if 'Processing TIC' in line or 'Analyzing' in line:
+                    progress = min(progress + (80 / total_tics), 80)
+                elif 'Generating catalog' in line or 'Writing results' in line:
+                    progress = 90
+
+                # Mettre à jour la progression toutes les 10 lignes
+                if len(output_lines) % 10 == 0:
+                    metadata['progress'] = int(progress)
+                    with open(metadata_path, 'w') as f:
+                        json.dump(metadata, f, indent=2)
             
             return_code = process.wait()
             
@@ -427,20 +463,24 @@ class ExoMinerService:
             if metadata['status'] not in ['completed', 'analyzing']:
                 return False, f"Analyse en statut: {metadata['status']}", metadata
             
-            # Lister les fichiers de sortie
+            # Lister les fichiers de sortie — stat() en parallèle (syscalls
+            # qui relâchent le GIL), utile sur montages réseau
             output_dir = metadata['output_dir']
             files = []
-            
+
             if os.path.exists(output_dir):
-                for root, dirs, filenames in os.walk(output_dir):
-                    for filename in filenames:
-                        filepath = os.path.join(root, filename)
-                        size_mb = os.path.getsize(filepath) / 1024 / 1024
-                        files.append({
-                            'name': filename,
-                            'path': filepath,
-                            'size_mb': round(size_mb, 2)
-                        })
+                def file_info(path):
+                    if not path.is_file():
+                        return None
+                    size_mb = path.stat().st_size / 1024 / 1024
+                    return {
+                        'name': path.name,
+                        'path': str(path),
+                        'size_mb': round(size_mb, 2)
+                    }
+
+                with ThreadPoolExecutor(max_workers=16) as pool:
+                    files = [info for info in pool.map(file_info, Path(output_dir).rglob('*')) if info]
             
             # Parser predictions_outputs.csv avec build_results_table
             predictions_data = None
@@ -1,10 +1,22 @@
+import numpy as np
 import polars as pl
 
-# Charger le fichier CSV d'origine
-df = pl.read_csv("exominer-tics-with-sectors.csv")
+# Scanner le fichier CSV d'origine en lazy (pas de chargement complet)
+lf = pl.scan_csv("exominer-tics-with-sectors.csv")
 
-# Sélectionner 50 lignes aléatoires
-sample_df = df.sample(n=50, with_replacement=False, shuffle=True, seed=79)
+# Compter les lignes en un seul passage léger
+n_rows = lf.select(pl.len()).collect().item()
+
+# Tirer 50 indices aléatoires (seed inchangée pour la reproductibilité)
+indices = np.random.default_rng(79).choice(n_rows, size=50, replace=False)
+
+# Ne décoder que les lignes retenues, en streaming
+sample_df = (
+    lf.with_row_index()
+    .filter(pl.col("index").is_in(indices))
+    .collect(engine="streaming")
+    .drop("index")
+)
 
 # Sauvegarder le résultat dans un nouveau CSV
 sample_df.write_csv("sample_50.csv")
@@ -7,8 +7,12 @@ Version simplifiée pour Windows
 import subprocess
 import os
 import pandas as pd
+import queue
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 
 # Configuration
 IMAGE_NAME = "ghcr.io/nasa/exominer:amd64"
@@ -49,16 +53,21 @@ def validate_csv():
         return False
     
     try:
-        df = pd.read_csv(CSV_FILE)
-        print(f"CSV valide: {len(df)} entrées")
-        print(f"Colonnes: {list(df.columns)}")
-        
+        # Vérifier les colonnes sur l'en-tête seul (aucune ligne parsée)
+        columns = list(pd.read_csv(CSV_FILE, nrows=0).columns)
+
         required = ['tic_id', 'sector_run']
-        missing = [col for col in required if col not in df.columns]
+        missing = [col for col in required if col not in columns]
         if missing:
             print(f"ERREUR: Colonnes manquantes: {missing}")
             return False
-        
+
+        # Ne parser que les deux colonnes utiles, avec le parser Arrow
+        # multi-thread — le reste du fichier n'est jamais décodé
+        df = pd.read_csv(CSV_FILE, usecols=required, engine='pyarrow')
+        print(f"CSV valide: {len(df)} entrées")
+        print(f"Colonnes: {columns}")
+
         print("Échantillon:")
         print(df.head())
         return True
@@ -67,6 +76,43 @@ def validate_csv():
         print(f"ERREUR CSV: {e}")
         return False
 
+def pump_process_output(process):
+    """
+    Itère sur les lignes de sortie d'un process via un thread lecteur.
+    Lit par blocs de 64 Ko avec os.read au lieu d'un readline() bloquant
+    par ligne: moins de syscalls et pas de contre-pression sur le PIPE
+    quand ExoMiner loggue massivement.
+    """
+    lines_queue = queue.Queue()
+
+    def reader():
+        fd = process.stdout.fileno()
+        pending = b''
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                break
+            if not chunk:
+                break
+            pending += chunk
+            if b'\n' in pending:
+                complete, pending = pending.rsplit(b'\n', 1)
+                lines_queue.put(complete.decode('utf-8', errors='replace').splitlines())
+        if pending:
+            lines_queue.put(pending.decode('utf-8', errors='replace').splitlines())
+        lines_queue.put(None)
+
+    threading.Thread(target=reader, daemon=True).start()
+
+    while True:
+        batch = lines_queue.get()
+        if batch is None:
+            break
+        for line in batch:
+            yield line.strip()
+
+
 def run_exominer_container():
     """Lance ExoMiner dans un nouveau conteneur"""
     try:
@@ -102,26 +148,20 @@ def run_exominer_container():
         print("\nCommande:")
         print(" ".join(cmd))
         
-        # Exécution
+        # Exécution (sortie binaire bufferisée, pompée par un thread lecteur)
         process = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1
+            bufsize=-1
         )
-        
+
         # Suivi en temps réel
         output_lines = []
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                line = output.strip()
-                print(f"[ExoMiner] {line}")
-                output_lines.append(line)
-        
+        for line in pump_process_output(process):
+            print(f"[ExoMiner] {line}")
+            output_lines.append(line)
+
         return_code = process.wait()
         return return_code == 0, output_dir, output_lines
         
@@ -137,16 +177,19 @@ def analyze_results(output_dir):
     
     print(f"\nAnalyse des résultats dans {output_dir}:")
     
-    # Lister les fichiers
-    files = []
-    for root, dirs, filenames in os.walk(output_dir):
-        for filename in filenames:
-            filepath = os.path.join(root, filename)
-            size_mb = os.path.getsize(filepath) / 1024 / 1024
-            files.append({
-                'name': filename,
-                'size_mb': round(size_mb, 2)
-            })
+    # Lister les fichiers — les stat() partent en parallèle (ils relâchent
+    # le GIL), utile sur disques réseau/lents
+    def file_info(path):
+        if not path.is_file():
+            return None
+        size_mb = path.stat().st_size / 1024 / 1024
+        return {
+            'name': path.name,
+            'size_mb': round(size_mb, 2)
+        }
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        files = [info for info in pool.map(file_info, Path(output_dir).rglob('*')) if info]
     
     print(f"Fichiers générés ({len(files)}):")
     for file_info in files:
@@ -2,15 +2,36 @@
 Script de test pour générer UN SEUL CSV avec tous les fichiers FITS
 """
 
-from pathlib import Path
+import multiprocessing
+import os
 import re
-import time
-import gc
+import sys
+import threading
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from tqdm import tqdm
 import concurrent.futures
-import lightkurve as lk
+from astropy.io import fits
+
+# fitsio lit la table binaire directement (~40% plus rapide et beaucoup
+# moins de mémoire); astropy en memmap sert de fallback
+try:
+    import fitsio
+    HAS_FITSIO = True
+except ImportError:
+    HAS_FITSIO = False
+
+
+# Motifs compilés une fois au chargement du module (appelés une fois par fichier)
+_TIC_RE = re.compile(r"-0+(\d+)-")
+_SECTOR_RE = re.compile(r"-s(\d+)-")
+# Le secteur précède directement le TIC dans les noms TESS : un seul scan suffit
+_SECTOR_TIC_RE = re.compile(r"-s(\d+)-0+(\d+)-")
 
 
 def extract_tic_from_filename(filename):
@@ -18,11 +39,8 @@ def extract_tic_from_filename(filename):
     Extrait le TIC depuis le nom de fichier TESS.
     Format: tess*-s*-*TIC*-*-s_lc.fits
     """
-    pattern = r"-0+(\d+)-"
-    match = re.search(pattern, filename)
-    if match:
-        return int(match.group(1))
-    return None
+    match = _TIC_RE.search(filename)
+    return int(match.group(1)) if match else None
 
 
 def extract_sector_from_filename(filename):
@@ -30,165 +48,267 @@ def extract_sector_from_filename(filename):
     Extrait le numéro de secteur depuis le nom de fichier TESS.
     Format: tess*-s0092-*-s_lc.fits où 0092 est le secteur
     """
-    pattern = r"-s(\d+)-"
-    match = re.search(pattern, filename)
+    match = _SECTOR_RE.search(filename)
+    return int(match.group(1)) if match else None
+
+
+def _extract_tic_and_sector(filename):
+    """
+    Extrait (tic, sector) en un seul passage sur le nom de fichier.
+    Retourne (None, None) si le motif ne matche pas.
+    """
+    match = _SECTOR_TIC_RE.search(filename)
     if match:
-        return int(match.group(1))
-    return None
+        return int(match.group(2)), int(match.group(1))
+    # Fallback sur les motifs séparés (noms non standard)
+    return extract_tic_from_filename(filename), extract_sector_from_filename(filename)
+
+
+def _recarray_to_dataframe(data, tic=None, sector=None):
+    """
+    Convertit un recarray FITS en DataFrame pandas sans copie superflue.
+    Les colonnes vectorielles (2D) sont ignorées — inexploitables en CSV plat.
+
+    Si tic/sector sont fournis, les colonnes constantes TIC (int32) et
+    SECTOR (int16) sont allouées via np.full et incluses dans LA
+    construction du DataFrame : un seul bloc numpy par colonne, sans
+    passer par la machinerie setitem de pandas (alignement d'index,
+    inférence de dtype, consolidation de blocs) répétée à chaque fichier.
+    """
+    columns = {}
+    for name in data.dtype.names:
+        arr = np.ascontiguousarray(data[name])
+        if arr.ndim > 1:
+            continue
+        # FITS est big-endian, pandas attend l'endianness native
+        if arr.dtype.byteorder == '>':
+            arr = arr.byteswap().view(arr.dtype.newbyteorder('='))
+        # float32 suffit pour les flux (les colonnes TESS natives le sont
+        # déjà) : moitié moins d'octets à transférer, écrire et relire.
+        # TIME reste en float64 — en float32, un BTJD ~2000 perdrait
+        # la précision sub-minute.
+        if arr.dtype == np.float64 and name != 'TIME':
+            arr = arr.astype(np.float32)
+        columns[name] = arr
+
+    # Colonnes TIC/SECTOR à la fin, pour préserver l'ordre des colonnes
+    # originales
+    n_rows = len(data)
+    if tic is not None:
+        columns['TIC'] = np.full(n_rows, tic, dtype=np.int32)
+    if sector is not None:
+        columns['SECTOR'] = np.full(n_rows, sector, dtype=np.int16)
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def _read_lightcurve_dataframe(fits_path, tic=None, sector=None):
+    """
+    Lit la table LIGHTCURVE d'un fichier FITS en DataFrame pandas,
+    avec les colonnes constantes TIC/SECTOR incluses à la construction
+    si elles sont fournies.
+
+    Chemin rapide via fitsio : seule la table binaire est lue, sans
+    construction d'objet LightCurve ni parsing de tous les headers.
+    Fallback astropy en memmap + chargement paresseux des HDU : on ne
+    touche que la table LIGHTCURVE, là où lightkurve construisait une
+    Table intermédiaire puis recopiait chaque colonne via to_pandas().
+
+    Note : les deux chemins conservent les noms de colonnes FITS
+    (TIME, SAP_FLUX, ...).
+
+    Le motif d'accès est annoncé au noyau via posix_fadvise :
+    SEQUENTIAL puis WILLNEED avant la lecture (readahead agressif, utile sur
+    NFS/disques lents), DONTNEED après (un fichier n'est lu qu'une fois
+    sur un run de 200k fichiers, inutile de polluer le page cache).
+    """
+    advise_fd = None
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            advise_fd = os.open(str(fits_path), os.O_RDONLY)
+            # advice est une énumération, pas un bitmask : deux appels
+            os.posix_fadvise(advise_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(advise_fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            advise_fd = None
 
+    try:
+        if HAS_FITSIO:
+            with fitsio.FITS(str(fits_path)) as fits_file:
+                data = fits_file['LIGHTCURVE'].read()
+            return _recarray_to_dataframe(data, tic=tic, sector=sector)
+
+        # Fallback: astropy, sans passer par lightkurve
+        with fits.open(str(fits_path), memmap=True, lazy_load_hdus=True) as hdul:
+            # np.asarray ramène le FITS_rec à un structured array brut :
+            # accès champ numpy direct, sans la machinerie field() d'astropy
+            data = np.asarray(hdul['LIGHTCURVE'].data)
+            return _recarray_to_dataframe(data, tic=tic, sector=sector)
+    finally:
+        if advise_fd is not None:
+            try:
+                os.posix_fadvise(advise_fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+            os.close(advise_fd)
 
-def extract_dataframe_from_fits(fits_path):
+
+def extract_dataframe_from_fits(fits_path, tic=None, sector=None):
     """
     Extrait le DataFrame d'un fichier FITS avec TIC et SECTOR.
-    
+
     Args:
-        fits_path (Path): Chemin vers le fichier FITS
-    
+        fits_path (Path or str): Chemin vers le fichier FITS
+        tic (int): TIC déjà parsé depuis le nom de fichier (optionnel)
+        sector (int): Secteur déjà parsé depuis le nom de fichier (optionnel)
+
     Returns:
         tuple: (DataFrame, dict) - DataFrame ou None si erreur, et résultat
     """
+    filename = os.path.basename(str(fits_path))
     try:
-        # Extraire le TIC depuis le nom de fichier
-        tic = extract_tic_from_filename(fits_path.name)
-        
+        # Extraire TIC et secteur en un seul scan du nom de fichier
+        # (sauf s'ils ont déjà été parsés en amont, de façon vectorisée)
+        if tic is None or sector is None:
+            tic, sector = _extract_tic_and_sector(filename)
+
         if tic is None:
             return None, {
                 'status': 'failed',
-                'filename': fits_path.name,
+                'filename': filename,
                 'error': 'Impossible d\'extraire le TIC'
             }
-        
-        # Extraire le secteur depuis le nom de fichier
-        sector = extract_sector_from_filename(fits_path.name)
-        
+
         if sector is None:
             return None, {
                 'status': 'failed',
-                'filename': fits_path.name,
+                'filename': filename,
                 'error': 'Impossible d\'extraire le SECTOR'
             }
-        
-        # Lire le fichier FITS avec lightkurve
-        lc = lk.read(str(fits_path))
-        
-        # Convertir en DataFrame pandas
-        df = lc.to_pandas()
-        
-        # IMPORTANT: Réinitialiser l'index pour que 'time' devienne une colonne
-        # Si l'index s'appelle 'time', on le transforme en colonne
-        if df.index.name == 'time' or (hasattr(df.index, 'name') and df.index.name is not None):
-            df = df.reset_index()
-        
-        # Ajouter les colonnes TIC et SECTOR à la fin (pas au début)
-        # Cela préserve toutes les colonnes originales
-        df['TIC'] = tic
-        df['SECTOR'] = sector
-        
+
+        # Lire la table LIGHTCURVE (fitsio si dispo, sinon astropy), avec
+        # TIC (int32) et SECTOR (int16) construits directement en colonnes
+        # constantes à la fin — les colonnes originales sont préservées
+        df = _read_lightcurve_dataframe(fits_path, tic=tic, sector=sector)
+
         return df, {
             'status': 'success',
-            'filename': fits_path.name,
+            'filename': filename,
             'tic': tic,
             'sector': sector,
             'rows': len(df)
         }
-        
+
     except Exception as e:
         return None, {
             'status': 'failed',
-            'filename': fits_path.name,
+            'filename': filename,
             'error': str(e)
         }
 
 
-def process_single_fits(fits_path, output_dir, stats_lock=None, stats=None):
+def _extract_arrow_bytes(fits_path, tic=None, sector=None):
     """
-    Traite un seul fichier FITS et génère un CSV avec les données
-    de la courbe de lumière et le TIC.
-    
+    Worker pour le pool de processus : extrait le DataFrame et le renvoie
+    sérialisé en flux IPC Arrow (bien moins cher à transférer entre
+    processus qu'un DataFrame pandas picklé).
+
+    Returns:
+        tuple: (bytes ou None, dict) - buffer IPC Arrow et résultat
+    """
+    df, result = extract_dataframe_from_fits(fits_path, tic=tic, sector=sector)
+    if df is None:
+        return None, result
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as ipc_writer:
+        ipc_writer.write_table(table)
+    return sink.getvalue(), result
+
+
+# Dossiers de sortie déjà créés par ce processus : un mkdir (stat + syscall
+# potentiel) par fichier devient un mkdir par dossier
+_created_dirs = set()
+
+
+def process_single_fits(fits_path, output_dir, existing=None):
+    """
+    Traite un seul fichier FITS et génère un Parquet (zstd) avec les
+    données de la courbe de lumière et le TIC.
+    Pas de lock partagé : le dict résultat suffit à l'appelant pour
+    agréger ses statistiques.
+
     Args:
         fits_path (Path): Chemin vers le fichier FITS
-        output_dir (Path): Dossier de sortie pour les CSV
-        stats_lock (Lock): Lock pour mise à jour thread-safe des stats
-        stats (dict): Dictionnaire de statistiques
-    
+        output_dir (Path): Dossier de sortie pour les Parquet
+        existing (set): Noms de fichiers déjà présents dans output_dir
+            (ex: set(os.listdir(output_dir))). Pour une reprise sur un
+            gros run, le test d'appartenance O(1) remplace un stat par
+            fichier.
+
     Returns:
         dict: Résultat du traitement
     """
     try:
-        # Extraire le TIC depuis le nom de fichier
-        tic = extract_tic_from_filename(fits_path.name)
-        
+        # Extraire TIC et secteur en un seul scan du nom de fichier
+        tic, sector = _extract_tic_and_sector(fits_path.name)
+
         if tic is None:
             return {
                 'status': 'failed',
                 'filename': fits_path.name,
                 'error': 'Impossible d\'extraire le TIC'
             }
-        
-        # Extraire le secteur depuis le nom de fichier
-        sector = extract_sector_from_filename(fits_path.name)
-        
+
         if sector is None:
             return {
                 'status': 'failed',
                 'filename': fits_path.name,
                 'error': 'Impossible d\'extraire le SECTOR'
             }
-        
+
         # Créer le nom de fichier de sortie
-        output_filename = fits_path.stem + '_LIGHTCURVE_data.csv'
+        output_filename = fits_path.stem + '_LIGHTCURVE_data.parquet'
         output_path = output_dir / output_filename
         
-        # Si le fichier existe déjà, le skipper
-        if output_path.exists():
-            if stats_lock and stats:
-                with stats_lock:
-                    stats['skipped'] += 1
+        # Si le fichier existe déjà, le skipper (appartenance au set
+        # pré-construit si fourni, sinon un stat)
+        already_done = (output_filename in existing) if existing is not None else output_path.exists()
+        if already_done:
             return {
                 'status': 'skipped',
                 'filename': fits_path.name,
                 'output': str(output_path)
             }
         
-        # Lire le fichier FITS avec lightkurve
-        lc = lk.read(str(fits_path))
-        
-        # Convertir en DataFrame pandas
-        df = lc.to_pandas()
-        
-        # IMPORTANT: Réinitialiser l'index pour que 'time' devienne une colonne
-        # Si l'index s'appelle 'time', on le transforme en colonne
-        if df.index.name == 'time' or (hasattr(df.index, 'name') and df.index.name is not None):
-            df = df.reset_index()
-        
-        # Ajouter les colonnes TIC et SECTOR à la fin (pas au début)
-        # Cela préserve toutes les colonnes originales
-        df['TIC'] = tic
-        df['SECTOR'] = sector
-        
-        # Créer le dossier de sortie s'il n'existe pas
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Sauvegarder en CSV
-        df.to_csv(output_path, index=False)
-        
-        if stats_lock and stats:
-            with stats_lock:
-                stats['success'] += 1
-        
+        # Lire la table LIGHTCURVE (fitsio si dispo, sinon astropy), avec
+        # TIC (int32) et SECTOR (int16) construits directement en colonnes
+        # constantes à la fin — les colonnes originales sont préservées
+        df = _read_lightcurve_dataframe(fits_path, tic=tic, sector=sector)
+
+        # Créer le dossier de sortie s'il n'existe pas (une fois par dossier)
+        if str(output_dir) not in _created_dirs:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            _created_dirs.add(str(output_dir))
+
+        # Sauvegarder en Parquet (binaire colonne + zstd : écriture bien
+        # plus rapide et ~8x plus compact que le CSV)
+        df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+
         return {
             'status': 'success',
             'filename': fits_path.name,
             'output': str(output_path),
             'tic': tic,
             'sector': sector,
-            'rows': len(df)
+            'rows': len(df),
+            # DataFrame déjà en mémoire : l'appelant qui veut inspecter le
+            # résultat n'a pas à relire le Parquet qu'on vient d'écrire
+            'dataframe': df
         }
         
     except Exception as e:
-        if stats_lock and stats:
-            with stats_lock:
-                stats['failed'] += 1
         return {
             'status': 'failed',
             'filename': fits_path.name,
@@ -196,38 +316,94 @@ def process_single_fits(fits_path, output_dir, stats_lock=None, stats=None):
         }
 
 
-def process_all_fits_single_csv(fits_dir, output_file='all_lightcurves.csv', max_workers=3, progress_bar=True, batch_size=100, keep_batches=False):
+def _pin_worker():
     """
-    Traite tous les fichiers FITS et génère UN SEUL fichier CSV avec toutes les données.
-    Stratégie optimisée : crée des fichiers CSV intermédiaires par batch, puis les fusionne.
-    Cette approche est plus résiliente aux crashes et permet de reprendre en cas d'erreur.
-    
+    Initializer des workers du pool : épingle chaque processus sur un
+    cœur (choisi par PID) pour que les allocations pandas/numpy restent
+    chaudes en L2/L3 au lieu de migrer de cœur en cœur. No-op sur les
+    plateformes sans sched_setaffinity (Windows, macOS).
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return
+    try:
+        cores = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cores[os.getpid() % len(cores)]})
+    except OSError:
+        pass
+
+
+def _start_prefetch_thread(paths, budget):
+    """
+    Lance un thread qui annonce les fichiers à venir au noyau via
+    posix_fadvise(WILLNEED), cadencé par un sémaphore pour rester
+    quelques fichiers en avance sur les workers. Le readahead du noyau
+    charge ainsi les pages pendant que les workers parsent : l'I/O et le
+    CPU se recouvrent au lieu de se sérialiser dans chaque worker.
+
+    Returns:
+        threading.Semaphore ou None (plateformes sans posix_fadvise).
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return None
+
+    semaphore = threading.Semaphore(budget)
+
+    def prefetch():
+        for path in paths:
+            semaphore.acquire()
+            try:
+                fd = os.open(str(path), os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+            except OSError:
+                continue
+
+    threading.Thread(target=prefetch, daemon=True).start()
+    return semaphore
+
+
+def process_all_fits_single_csv(fits_dir, output_file='all_lightcurves.csv', max_workers=None, progress_bar=True):
+    """
+    Traite tous les fichiers FITS et génère UN SEUL fichier de sortie.
+    Le parsing FITS est surtout du Python sous GIL : le pool de PROCESSUS
+    donne un scaling quasi linéaire sur les cœurs là où les threads se
+    gênaient. Les workers renvoient des buffers IPC Arrow (pas de pickle
+    de DataFrame) et chaque résultat est écrit dès qu'il est prêt via un
+    writer Arrow (Parquet zstd si l'extension est .parquet, sinon CSV).
+    Plus de liste all_dataframes, de pd.concat ni de fichiers batch
+    intermédiaires : la mémoire reste bornée quel que soit le nombre de
+    fichiers, et la sérialisation passe par le writer colonne C++ d'Arrow
+    au lieu du formateur CSV ligne-à-ligne de pandas.
+
     Args:
         fits_dir (Path or str): Dossier contenant les fichiers FITS
-        output_file (str): Nom du fichier CSV de sortie final
-        max_workers (int): Nombre de threads parallèles (défaut: 3, max recommandé: 4)
+        output_file (str): Nom du fichier de sortie final (.csv ou .parquet)
+        max_workers (int): Nombre de processus parallèles (défaut: os.cpu_count())
         progress_bar (bool): Afficher la barre de progression
-        batch_size (int): Nombre de DataFrames à accumuler avant d'écrire un batch CSV (défaut: 100)
-        keep_batches (bool): Garder les fichiers batch temporaires après fusion (défaut: False)
-    
+
     Returns:
         dict: Résultats du traitement avec statistiques
     """
     fits_dir = Path(fits_dir)
     output_path = Path(output_file)
-    
-    # Créer un dossier temporaire pour les fichiers batch
-    batch_dir = output_path.parent / 'temp_batches'
-    batch_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Trouver tous les fichiers FITS
-    fits_files = list(fits_dir.glob('*.fits'))
-    
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    # Trouver tous les fichiers FITS : os.scandir renvoie des DirEntry
+    # légers, sans construire un objet Path par fichier; on garde des
+    # chemins str (moins d'octets à pickler vers les workers). Tri pour
+    # un ordre de lecture déterministe et séquentiel sur disque.
+    fits_files = sorted(
+        entry.path for entry in os.scandir(fits_dir)
+        if entry.name.endswith('.fits')
+    )
+
     print(f"Trouvé {len(fits_files)} fichiers FITS à traiter")
     print(f"Fichier de sortie final: {output_file}")
-    print(f"Dossier temporaire: {batch_dir}")
-    print(f"Batch size: {batch_size} fichiers (pour optimiser la mémoire)")
-    
+
     # Statistiques
     stats = {
         'total': len(fits_files),
@@ -235,170 +411,118 @@ def process_all_fits_single_csv(fits_dir, output_file='all_lightcurves.csv', max
         'failed': 0,
         'total_rows': 0
     }
-    
-    # Nettoyer les anciens fichiers batch s'ils existent
-    for old_batch in batch_dir.glob('batch_*.csv'):
-        old_batch.unlink()
-    
+
     # S'assurer que le dossier parent du fichier final existe
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    all_dataframes = []
-    batches_written = 0
-    batch_files = []  # Liste des fichiers batch créés
+    if output_path.exists():
+        output_path.unlink()
+
     failed_files = []  # Stocker uniquement les noms de fichiers échoués
-    
-    # Traitement en parallèle avec écriture par batch dans des fichiers séparés
-    if progress_bar:
-        with tqdm(total=len(fits_files), desc="Extraction FITS → Batch CSV") as pbar:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_file = {
-                    executor.submit(extract_dataframe_from_fits, fits_file): fits_file 
-                    for fits_file in fits_files
-                }
-                
-                for future in concurrent.futures.as_completed(future_to_file):
-                    df, result = future.result()
-                    
-                    if result['status'] == 'success' and df is not None:
-                        all_dataframes.append(df)
+
+    # Parser tous les noms de fichiers en UNE passe regex vectorisée :
+    # les fichiers au nom invalide sont écartés avant de payer la moindre I/O
+    if fits_files:
+        parsed = pd.Series([os.path.basename(f) for f in fits_files]).str.extract(_SECTOR_TIC_RE)
+        sectors = parsed[0].astype('Int32')
+        tics = parsed[1].astype('Int64')
+        valid_mask = tics.notna() & sectors.notna()
+
+        for i in np.flatnonzero(~valid_mask.to_numpy()):
+            stats['failed'] += 1
+            failed_files.append(os.path.basename(fits_files[i]))
+
+        valid_files = [
+            (fits_files[i], int(tics.iloc[i]), int(sectors.iloc[i]))
+            for i in np.flatnonzero(valid_mask.to_numpy())
+        ]
+    else:
+        valid_files = []
+
+    use_parquet = output_path.suffix == '.parquet'
+    writer = None
+    schema = None
+
+    def write_table(table):
+        """Pousse une table dans le writer Arrow (ouvert au premier appel)."""
+        nonlocal writer, schema
+        if writer is None:
+            schema = table.schema
+            if use_parquet:
+                writer = pq.ParquetWriter(str(output_path), schema, compression='zstd')
+            else:
+                writer = pa_csv.CSVWriter(str(output_path), schema)
+        else:
+            # Aligner sur le schéma du premier fichier (ordre/types)
+            table = table.cast(schema)
+        writer.write_table(table)
+
+    # Traitement en parallèle avec écriture streaming au fil des résultats
+    pbar = tqdm(total=len(valid_files), desc="Extraction FITS → " + ("Parquet" if use_parquet else "CSV")) if progress_bar else None
+
+    # Préchauffer le page cache ~2 workers + 16 fichiers en avance
+    prefetch_sem = _start_prefetch_thread([f for f, _, _ in valid_files], budget=2 * max_workers + 16)
+
+    # Dispatch par paquets : un futur par fichier de ~100 ms fait payer la
+    # machinerie (submit, dict des futures, réveil par résultat) sur chaque
+    # fichier; map(chunksize=N) l'amortit sur N fichiers
+    chunksize = max(1, min(16, len(valid_files) // (max_workers * 4)))
+
+    # Recycler chaque worker tous les 50 fichiers borne la croissance RSS
+    # (fragmentation heap pandas/numpy) sans gc.collect() manuel.
+    # max_tasks_per_child requiert Python 3.11+ et le start method 'spawn'.
+    pool_kwargs = {'max_workers': max_workers, 'initializer': _pin_worker}
+    if sys.version_info >= (3, 11):
+        pool_kwargs['max_tasks_per_child'] = 50
+        pool_kwargs['mp_context'] = multiprocessing.get_context('spawn')
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(**pool_kwargs) as executor:
+            results_iter = executor.map(
+                _extract_arrow_bytes,
+                [f for f, _, _ in valid_files],
+                [t for _, t, _ in valid_files],
+                [s for _, _, s in valid_files],
+                chunksize=chunksize,
+            )
+
+            for buf, result in results_iter:
+                if result['status'] == 'success' and buf is not None:
+                    try:
+                        table = pa.ipc.open_stream(buf).read_all()
+                        write_table(table)
                         stats['success'] += 1
-                        stats['total_rows'] += len(df)
-                        pbar.set_postfix_str(f"✓ Batch: {len(all_dataframes)}/{batch_size} | Batches: {batches_written}")
-                    else:
+                        stats['total_rows'] += table.num_rows
+                    except Exception:
                         stats['failed'] += 1
                         failed_files.append(result['filename'])
-                        pbar.set_postfix_str(f"✗ Failed: {stats['failed']}")
-                    
-                    # Écrire le batch dans un fichier séparé quand il atteint la taille définie
-                    if len(all_dataframes) >= batch_size:
-                        batches_written += 1
-                        batch_file = batch_dir / f'batch_{batches_written:04d}.csv'
-                        
-                        batch_df = pd.concat(all_dataframes, ignore_index=True)
-                        batch_df.to_csv(batch_file, index=False)
-                        batch_files.append(batch_file)
-                        
-                        pbar.set_postfix_str(f"💾 Batch {batches_written} écrit ({len(batch_df)} rows) | Nettoyage...")
-                        
-                        # Libération agressive de la mémoire
-                        del all_dataframes
-                        del batch_df
-                        all_dataframes = []
-                        gc.collect()  # Force garbage collection
-                        
-                        # Petit délai pour laisser le système respirer
-                        time.sleep(0.3)
-                    
-                    pbar.update(1)
-    else:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(extract_dataframe_from_fits, fits_file) for fits_file in fits_files]
-            for future in concurrent.futures.as_completed(futures):
-                df, result = future.result()
-                
-                if result['status'] == 'success' and df is not None:
-                    all_dataframes.append(df)
-                    stats['success'] += 1
-                    stats['total_rows'] += len(df)
-                    
-                    # Écrire le batch dans un fichier séparé quand il atteint la taille définie
-                    if len(all_dataframes) >= batch_size:
-                        batches_written += 1
-                        batch_file = batch_dir / f'batch_{batches_written:04d}.csv'
-                        
-                        batch_df = pd.concat(all_dataframes, ignore_index=True)
-                        batch_df.to_csv(batch_file, index=False)
-                        batch_files.append(batch_file)
-                        
-                        print(f"💾 Batch {batches_written} écrit ({len(batch_df)} rows) | Nettoyage mémoire...")
-                        
-                        # Libération agressive de la mémoire
-                        del all_dataframes
-                        del batch_df
-                        all_dataframes = []
-                        gc.collect()  # Force garbage collection
-                        time.sleep(0.3)
                 else:
                     stats['failed'] += 1
                     failed_files.append(result['filename'])
-    
-    # Écrire le dernier batch restant (s'il y en a un)
-    if all_dataframes:
-        batches_written += 1
-        batch_file = batch_dir / f'batch_{batches_written:04d}.csv'
-        
-        print(f"\n💾 Écriture du dernier batch ({len(all_dataframes)} DataFrames)...")
-        batch_df = pd.concat(all_dataframes, ignore_index=True)
-        batch_df.to_csv(batch_file, index=False)
-        batch_files.append(batch_file)
-        
-        # Libération finale de la mémoire
-        del all_dataframes
-        del batch_df
-        gc.collect()
-    
-    # PHASE 2 : Fusion de tous les fichiers batch en un seul CSV
-    print(f"\n{'='*70}")
-    print(f"📦 PHASE 2 : FUSION DES BATCHES")
-    print(f"{'='*70}")
-    print(f"Nombre de fichiers batch à fusionner : {len(batch_files)}")
-    print(f"Fichier de sortie final : {output_file}")
-    
-    if batch_files:
-        # Supprimer l'ancien fichier de sortie s'il existe
-        if output_path.exists():
-            output_path.unlink()
-        
-        # Fusionner tous les fichiers batch
-        first_batch = True
-        with tqdm(total=len(batch_files), desc="Fusion des batch CSV → Fichier final") as pbar:
-            for batch_file in batch_files:
-                # Lire le batch par chunks pour économiser la mémoire
-                for chunk in pd.read_csv(batch_file, chunksize=10000):
-                    chunk.to_csv(
-                        output_file,
-                        mode='a' if not first_batch else 'w',
-                        header=first_batch,
-                        index=False
-                    )
-                    first_batch = False
-                
-                pbar.update(1)
-                pbar.set_postfix_str(f"Fusionné {pbar.n}/{len(batch_files)} batches")
-        
-        # Nettoyer les fichiers batch temporaires (sauf si keep_batches=True)
-        if not keep_batches:
-            print(f"\n🧹 Nettoyage des fichiers temporaires...")
-            for batch_file in batch_files:
-                batch_file.unlink()
-            
-            # Supprimer le dossier temporaire s'il est vide
-            try:
-                batch_dir.rmdir()
-                print(f"✅ Dossier temporaire supprimé : {batch_dir}")
-            except:
-                print(f"⚠️  Le dossier temporaire contient encore des fichiers : {batch_dir}")
-        else:
-            print(f"\n📦 Fichiers batch conservés dans : {batch_dir}")
-            print(f"   • Nombre de fichiers : {len(batch_files)}")
-        
-        gc.collect()  # Dernier nettoyage mémoire
-    
+
+                if prefetch_sem is not None:
+                    prefetch_sem.release()
+                if pbar:
+                    pbar.update(1)
+                    # Rafraîchir le texte 1 fois sur 64 : set_postfix_str
+                    # à chaque fichier coûte plus que le dispatch lui-même
+                    if pbar.n % 64 == 0:
+                        pbar.set_postfix_str(f"✓ {stats['success']} | ✗ {stats['failed']} | Lignes: {stats['total_rows']:,}")
+    finally:
+        if pbar:
+            pbar.close()
+        if writer is not None:
+            writer.close()
+
     # Vérifier et afficher les résultats
     if output_path.exists():
-        print(f"\n✅ Fichier CSV créé: {output_file}")
+        print(f"\n✅ Fichier créé: {output_file}")
         print(f"   • Taille: {output_path.stat().st_size / (1024**2):.2f} MB")
-        print(f"   • Batches écrits: {batches_written}")
         print(f"   • Lignes totales: {stats['total_rows']:,}")
-        
-        # Compter les colonnes en lisant juste l'en-tête
-        sample_df = pd.read_csv(output_file, nrows=0)
-        print(f"   • Colonnes: {len(sample_df.columns)}")
-        del sample_df
+        if schema is not None:
+            print(f"   • Colonnes: {len(schema.names)}")
     else:
-        print("\n❌ Aucun fichier CSV généré")
-    
+        print("\n❌ Aucun fichier généré")
+
     # Afficher quelques fichiers échoués si nécessaire
     if failed_files:
         print(f"\n⚠️  Fichiers échoués: {len(failed_files)}")
@@ -421,9 +545,8 @@ def get_csv_from_fits():
     # Configuration ULTRA-OPTIMISÉE pour éviter les crashes WSL
     FITS_DIR = Path("data/TESS/fits")
     OUTPUT_FILE = 'data/final/all_lightcurves.csv'
-    # Configuration très conservatrice pour garantir la stabilité
-    WORKERS = 3  # Nombre réduit pour stabilité maximale
-    BATCH_SIZE = 100  # Batch réduit pour libération fréquente de la mémoire
+    # Un processus par cœur : le parsing FITS est CPU-bound
+    WORKERS = os.cpu_count() or 1
     
     if not FITS_DIR.exists():
         print("❌ Dossier FITS introuvable: data/TESS/fits/")
@@ -439,14 +562,10 @@ def get_csv_from_fits():
     print(f"📊 Nombre de fichiers FITS: {len(fits_files)}")
     print(f"📄 Fichier de sortie: {OUTPUT_FILE}")
     print(f"\n⚙️  Stratégie d'optimisation:")
-    print(f"   • Phase 1: Extraction FITS → Fichiers batch CSV")
-    print(f"   • Phase 2: Fusion des batches → Fichier final unique")
+    print(f"   • Extraction FITS → Écriture streaming Arrow dans le fichier final")
     print(f"\n🔧 Configuration:")
-    print(f"   • Workers: {WORKERS} (stabilité maximale)")
-    print(f"   • Batch size: {BATCH_SIZE} fichiers/batch")
-    print(f"   • Garbage collection: Activé après chaque batch")
-    print(f"   • Délai entre batches: 0.3s")
-    print(f"   • Nombre de batches attendus: ~{len(fits_files) // BATCH_SIZE + 1}")
+    print(f"   • Workers: {WORKERS} processus (parsing FITS CPU-bound)")
+    print(f"   • Mémoire bornée: aucun batch intermédiaire")
     
     if len(fits_files) == 0:
         print("\n❌ Aucun fichier FITS trouvé!")
@@ -459,8 +578,7 @@ def get_csv_from_fits():
         fits_dir=FITS_DIR,
         output_file=OUTPUT_FILE,
         max_workers=WORKERS,
-        progress_bar=True,
-        batch_size=BATCH_SIZE
+        progress_bar=True
     )
     
     # Afficher les résultats
@@ -8,6 +8,53 @@ import os
 import glob
 from pathlib import Path
 
+
+def _advise(fd, advice_name):
+    """posix_fadvise silencieux (no-op sur les plateformes sans support)."""
+    advice = getattr(os, advice_name, None)
+    if advice is not None and hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, advice)
+        except OSError:
+            pass
+
+
+def _copy_remainder(infile, outfile, buffer_size):
+    """
+    Copie le reste de infile vers outfile et retourne le nombre d'octets.
+    Utilise os.sendfile quand il est disponible : la copie reste dans le
+    noyau, sans aller-retour de buffers Python en espace utilisateur.
+    Fallback en copie par blocs là où sendfile ne gère pas fichier→fichier.
+    """
+    total = 0
+    if hasattr(os, 'sendfile'):
+        # sendfile écrit au niveau du fd : vider d'abord le buffer Python
+        # d'outfile, sinon des octets d'un fallback précédent partiraient
+        # APRÈS ceux de ce batch et mélangeraient les lignes
+        outfile.flush()
+        try:
+            in_fd = infile.fileno()
+            out_fd = outfile.fileno()
+            offset = infile.tell()
+            while True:
+                sent = os.sendfile(out_fd, in_fd, offset, 1 << 24)
+                if sent == 0:
+                    return total
+                offset += sent
+                total += sent
+        except OSError:
+            if total:
+                raise  # échec en cours de copie : ne pas dupliquer des octets
+            # sendfile indisponible pour fichier→fichier : copie classique
+
+    while True:
+        chunk = infile.read(buffer_size)
+        if not chunk:
+            return total
+        outfile.write(chunk)
+        total += len(chunk)
+
+
 def merge_batch_files_fast(input_dir, output_file, buffer_size=1024*1024):
     """
     Merge all batch CSV files in the input directory into a single CSV file.
@@ -44,29 +91,21 @@ def merge_batch_files_fast(input_dir, output_file, buffer_size=1024*1024):
     with open(output_path, 'wb') as outfile:
         for i, batch_file in enumerate(batch_files, 1):
             print(f"\nProcessing {i}/{len(batch_files)}: {Path(batch_file).name}")
-            
+
             with open(batch_file, 'rb') as infile:
-                # For the first file, copy everything including header
-                if i == 1:
-                    while True:
-                        chunk = infile.read(buffer_size)
-                        if not chunk:
-                            break
-                        outfile.write(chunk)
-                        total_bytes += len(chunk)
-                else:
-                    # For subsequent files, skip the header line
-                    # Read first line (header) and discard it
+                # Annoncer la lecture séquentielle : readahead agressif
+                _advise(infile.fileno(), 'POSIX_FADV_SEQUENTIAL')
+
+                # For subsequent files, skip the header line
+                if i > 1:
                     infile.readline()
-                    
-                    # Copy the rest of the file
-                    while True:
-                        chunk = infile.read(buffer_size)
-                        if not chunk:
-                            break
-                        outfile.write(chunk)
-                        total_bytes += len(chunk)
-            
+
+                # Copy the rest of the file (in-kernel via sendfile si possible)
+                total_bytes += _copy_remainder(infile, outfile, buffer_size)
+
+                # Chaque batch n'est lu qu'une fois : libérer ses pages
+                _advise(infile.fileno(), 'POSIX_FADV_DONTNEED')
+
             file_size_mb = Path(batch_file).stat().st_size / (1024 * 1024)
             print(f"  ✓ Copied {file_size_mb:.2f} MB from {Path(batch_file).name}")
     
@@ -3,42 +3,109 @@
 Script pour extraire le contenu d'un fichier FITS TESS dans un dossier séparé.
 Le script extrait:
 - Les métadonnées (header) en format texte et JSON
-- Les données de la courbe de lumière en CSV
+- Les données de la courbe de lumière en Parquet (CSV avec --with-csv)
 - Les informations sur chaque extension
 
 Dépendances:
-    pip install astropy pandas numpy pyarrow
+    pip install astropy pandas numpy pyarrow orjson
 
 Usage:
-    python test_fits.py [fichier_fits] [dossier_sortie]
-    
+    python test_fits.py [fichier_fits] [dossier_sortie] [--with-csv] [--stats] [--force]
+
 Exemples:
     python test_fits.py
     python test_fits.py data/TESS/fits/mon_fichier.fits output
+    python test_fits.py data/TESS/fits/mon_fichier.fits output --with-csv --stats
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import json
+from typing import TYPE_CHECKING
+import os
 import sys
+import threading
 
-from astropy.io import fits
-import pandas as pd
 import numpy as np
 
+if TYPE_CHECKING:
+    import pyarrow.parquet as pq
+
+# fitsio (CFITSIO) décode les tables binaires plus vite et avec moins de
+# mémoire qu'astropy; astropy reste utilisé pour les headers et en fallback
+try:
+    import fitsio
+    HAS_FITSIO = True
+except ImportError:
+    HAS_FITSIO = False
+
+# astropy/pyarrow/orjson sont importés au niveau fonction dans
+# extract_fits_content : les chemins CLI courts (usage, fichier absent,
+# extraction déjà à jour) ne paient pas leurs ~centaines de ms d'import
+
+
+# Dispatch par type exact : un seul lookup dict par valeur, au lieu d'une
+# chaîne de isinstance ré-évaluée pour chacune des centaines de cards
+_COERCERS = {
+    np.bool_: bool,
+    bytes: lambda v: v.decode('utf-8', errors='ignore'),
+}
+for _scalar in (np.int8, np.int16, np.int32, np.int64,
+                np.uint8, np.uint16, np.uint32, np.uint64,
+                np.float16, np.float32, np.float64):
+    _COERCERS[_scalar] = lambda v: v.item()
+del _scalar
+
 
-def extract_fits_content(fits_file: Path, output_dir: Path):
+def _coerce(value):
+    """Convertit les scalaires numpy/bytes en types Python natifs pour JSON."""
+    coercer = _COERCERS.get(type(value))
+    return coercer(value) if coercer is not None else value
+
+
+def extract_fits_content(fits_file: Path, output_dir: Path, with_csv: bool = False,
+                         write_stats: bool = False,
+                         parquet_writer: "pq.ParquetWriter | None" = None,
+                         force: bool = False):
     """
     Extrait tout le contenu d'un fichier FITS dans un dossier de sortie.
-    
+
     Args:
         fits_file (Path): Chemin vers le fichier FITS
         output_dir (Path): Dossier de sortie pour les fichiers extraits
+        with_csv (bool): Écrire aussi les tables en CSV (lent et volumineux;
+            le Parquet zstd est le format par défaut)
+        write_stats (bool): Écrire le résumé statistique par colonne
+            (désactivé par défaut : 8 agrégations par colonne pour un
+            fichier texte rarement consulté)
+        parquet_writer (pq.ParquetWriter | None): Writer Parquet partagé.
+            Fourni par un appelant qui boucle sur plusieurs FITS au schéma
+            identique (même secteur TESS), il évite de payer les métadonnées
+            Parquet à chaque fichier; sinon un Parquet par extension est écrit
+        force (bool): Ré-extraire même si une extraction à jour existe déjà
     """
     # Créer le dossier de sortie
     output_dir.mkdir(parents=True, exist_ok=True)
-    
+
     # Nom de base pour les fichiers de sortie
     base_name = fits_file.stem  # Sans l'extension .fits
+
+    # Le README est écrit en dernier : s'il existe et est plus récent que le
+    # FITS, l'extraction précédente est complète et à jour — deux stat()
+    # suffisent pour skipper tout le retraitement lors d'un re-run
+    sentinel = output_dir / f"{base_name}_README.txt"
+    if not force and sentinel.exists() \
+            and sentinel.stat().st_mtime >= fits_file.stat().st_mtime:
+        print(f"⏭️  Extraction déjà à jour pour {fits_file.name} "
+              f"(relancer avec --force pour ré-extraire)")
+        return
+
+    # Imports lourds différés jusqu'ici : seuls les runs qui extraient
+    # vraiment paient le démarrage d'astropy, pyarrow et orjson
+    import orjson
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    from astropy.io import fits
     
     print(f"📂 Extraction du fichier FITS: {fits_file.name}")
     print(f"📁 Dossier de sortie: {output_dir.resolve()}")
@@ -54,107 +121,192 @@ def extract_fits_content(fits_file: Path, output_dir: Path):
         print("\nStructure du fichier FITS:")
         hdul.info()
         
-        # Sauvegarder la structure
+        # Sauvegarder la structure (lignes assemblées puis un seul write :
+        # un syscall au lieu d'un par ligne)
         structure_file = output_dir / f"{base_name}_structure.txt"
-        with open(structure_file, 'w') as f:
-            f.write(f"Structure du fichier FITS: {fits_file.name}\n")
-            f.write("="*80 + "\n\n")
-            for i, hdu in enumerate(hdul):
-                f.write(f"Extension {i}: {hdu.name}\n")
-                f.write(f"  Type: {type(hdu).__name__}\n")
-                if hasattr(hdu, 'data') and hdu.data is not None:
-                    f.write(f"  Shape: {hdu.data.shape if hasattr(hdu.data, 'shape') else 'N/A'}\n")
-                f.write("\n")
+        structure_lines = [f"Structure du fichier FITS: {fits_file.name}", "="*80, ""]
+        for i, hdu in enumerate(hdul):
+            structure_lines.append(f"Extension {i}: {hdu.name}")
+            structure_lines.append(f"  Type: {type(hdu).__name__}")
+            if hasattr(hdu, 'data') and hdu.data is not None:
+                structure_lines.append(f"  Shape: {hdu.data.shape if hasattr(hdu.data, 'shape') else 'N/A'}")
+            structure_lines.append("")
+        structure_file.write_text("\n".join(structure_lines) + "\n", encoding='utf-8')
         print(f"✅ Structure sauvegardée: {structure_file.name}")
         
-        # Extraire chaque extension
+        # Première passe séquentielle : le handle astropy n'est pas
+        # thread-safe, on matérialise headers et données avant de fermer
+        # le fichier. hdu.size évite de charger les données juste pour
+        # savoir si l'extension en contient.
+        items = []
         for i, hdu in enumerate(hdul):
             extension_name = hdu.name if hdu.name else f"HDU_{i}"
-            print(f"\n{'='*80}")
-            print(f"EXTENSION {i}: {extension_name}")
-            print(f"{'='*80}")
-            
-            # 1. Extraire le header (métadonnées)
-            header_file = output_dir / f"{base_name}_{extension_name}_header.txt"
-            with open(header_file, 'w') as f:
-                f.write(f"Header de l'extension {i}: {extension_name}\n")
-                f.write("="*80 + "\n\n")
-                for card in hdu.header.cards:
-                    f.write(f"{card}\n")
-            print(f"✅ Header sauvegardé: {header_file.name}")
-            
-            # 2. Extraire le header en JSON
-            header_json = {}
-            for key in hdu.header:
-                value = hdu.header[key]
-                comment = hdu.header.comments[key]
-                # Convertir les types numpy en types Python pour JSON
-                if isinstance(value, (np.integer, np.floating)):
-                    value = value.item()
-                elif isinstance(value, np.bool_):
-                    value = bool(value)
-                elif isinstance(value, bytes):
-                    value = value.decode('utf-8', errors='ignore')
-                header_json[key] = {
-                    'value': value,
-                    'comment': comment
-                }
-            
-            json_file = output_dir / f"{base_name}_{extension_name}_header.json"
-            with open(json_file, 'w') as f:
-                json.dump(header_json, f, indent=2, default=str)
-            print(f"✅ Header JSON sauvegardé: {json_file.name}")
-            
-            # 3. Extraire les données si présentes
-            if hdu.data is not None:
-                if isinstance(hdu, fits.BinTableHDU):
-                    # C'est une table binaire (comme LIGHTCURVE)
-                    print(f"📊 Extension de type table binaire")
-                    print(f"   Colonnes: {hdu.columns.names}")
-                    print(f"   Nombre de lignes: {len(hdu.data)}")
-                    
-                    # Convertir en DataFrame pandas
-                    data_dict = {}
-                    for col in hdu.columns.names:
-                        data_dict[col] = hdu.data[col]
-                    
-                    df = pd.DataFrame(data_dict)
-                    
-                    # Sauvegarder en CSV
-                    csv_file = output_dir / f"{base_name}_{extension_name}_data.csv"
-                    df.to_csv(csv_file, index=False)
-                    print(f"✅ Données CSV sauvegardées: {csv_file.name}")
-                    
-                    # Sauvegarder aussi en Parquet (plus compact et rapide)
+            is_table = isinstance(hdu, fits.BinTableHDU)
+            is_image = isinstance(hdu, (fits.ImageHDU, fits.PrimaryHDU))
+            # fitsio relit les tables avec son propre handle (un par thread) :
+            # inutile de matérialiser le recarray astropy dans ce cas
+            if is_table and HAS_FITSIO:
+                data = None
+            else:
+                data = hdu.data
+            items.append((i, extension_name, hdu.header.copy(), data,
+                          hdu.size > 0, is_table, is_image))
+
+    # ParquetWriter n'est pas thread-safe : un FITS à plusieurs tables
+    # ferait écrire les workers en même temps dans le writer partagé
+    parquet_lock = threading.Lock()
+
+    def _process_extension(item):
+        """Traite une extension matérialisée; retourne ses lignes de log."""
+        i, extension_name, header, data, has_data, is_table, is_image = item
+        msgs = [f"\n{'='*80}", f"EXTENSION {i}: {extension_name}", '='*80]
+
+        # 1+2. Extraire le header texte et JSON en UN SEUL passage sur
+        # les cards : les accès header[key]/comments[key] refaisaient
+        # une recherche linéaire par mot-clé (O(N²) sur les gros headers)
+        header_file = output_dir / f"{base_name}_{extension_name}_header.txt"
+        header_lines = [f"Header de l'extension {i}: {extension_name}", "="*80, ""]
+        header_json = {}
+        for card in header.cards:
+            header_lines.append(str(card))
+            header_json[card.keyword] = {
+                'value': _coerce(card.value),
+                'comment': card.comment
+            }
+        # Des centaines de cards : un join + un write, pas un write par card
+        header_file.write_text("\n".join(header_lines) + "\n", encoding='utf-8')
+        msgs.append(f"✅ Header sauvegardé: {header_file.name}")
+
+        # Sérialisation C (orjson) + écriture binaire directe, sans
+        # wrapper texte ni encodeur json pur-Python
+        json_file = output_dir / f"{base_name}_{extension_name}_header.json"
+        json_file.write_bytes(orjson.dumps(
+            header_json,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+            default=str
+        ))
+        msgs.append(f"✅ Header JSON sauvegardé: {json_file.name}")
+
+        # 3. Extraire les données si présentes
+        if has_data:
+            if is_table:
+                # C'est une table binaire (comme LIGHTCURVE)
+                msgs.append("📊 Extension de type table binaire")
+
+                # Lire les colonnes via fitsio (décodage CFITSIO, gère la
+                # compression par tuiles) quand il est installé, sinon le
+                # recarray astropy
+                if HAS_FITSIO:
+                    with fitsio.FITS(str(fits_file)) as fits_reader:
+                        rec = fits_reader[i].read()
+                else:
+                    # np.asarray ramène le FITS_rec astropy à un structured
+                    # array brut : l'accès rec[col] devient un accès champ
+                    # numpy direct, sans re-parser le TFORM à chaque colonne
+                    rec = np.asarray(data)
+
+                col_names = list(rec.dtype.names)
+                msgs.append(f"   Colonnes: {col_names}")
+                msgs.append(f"   Nombre de lignes: {len(rec)}")
+
+                # Construire une table Arrow directement depuis les
+                # colonnes du recarray FITS : pas d'intermédiaire pandas
+                # (consolidation de blocs) sur le chemin Parquet
+                arrays = []
+                for col in col_names:
+                    arr = np.ascontiguousarray(rec[col])
+                    # FITS est big-endian, Arrow attend l'endianness native
+                    if arr.dtype.byteorder == '>':
+                        arr = arr.byteswap().view(arr.dtype.newbyteorder('='))
+                    arrays.append(pa.array(arr))
+                table = pa.Table.from_arrays(arrays, names=col_names)
+
+                # Sauvegarder en Parquet zstd (compact et rapide); le writer
+                # partagé, quand il est fourni, ajoute un row group au lieu
+                # de recréer fichier + métadonnées à chaque appel
+                if parquet_writer is not None:
+                    with parquet_lock:
+                        parquet_writer.write_table(table.cast(parquet_writer.schema))
+                    msgs.append("✅ Données ajoutées au Parquet partagé")
+                else:
                     parquet_file = output_dir / f"{base_name}_{extension_name}_data.parquet"
-                    df.to_parquet(parquet_file, index=False)
-                    print(f"✅ Données Parquet sauvegardées: {parquet_file.name}")
-                    
-                    # Créer un résumé statistique
+                    pq.write_table(table, parquet_file, compression="zstd")
+                    msgs.append(f"✅ Données Parquet sauvegardées: {parquet_file.name}")
+
+                # CSV uniquement sur demande (--with-csv) : ~10x plus
+                # lent à écrire et bien plus gros sur disque
+                if with_csv:
+                    csv_file = output_dir / f"{base_name}_{extension_name}_data.csv"
+                    table.to_pandas().to_csv(csv_file, index=False)
+                    msgs.append(f"✅ Données CSV sauvegardées: {csv_file.name}")
+
+                # Résumé statistique uniquement sur demande (--stats),
+                # calculé colonne par colonne via pyarrow.compute : pas de
+                # round-trip pandas ni de DataFrame describe() intermédiaire
+                if write_stats:
                     stats_file = output_dir / f"{base_name}_{extension_name}_stats.txt"
-                    with open(stats_file, 'w') as f:
-                        f.write(f"Statistiques de l'extension {extension_name}\n")
-                        f.write("="*80 + "\n\n")
-                        f.write(f"Nombre de lignes: {len(df)}\n")
-                        f.write(f"Colonnes: {', '.join(df.columns)}\n\n")
-                        f.write("Statistiques descriptives:\n")
-                        f.write("-"*80 + "\n")
-                        f.write(str(df.describe()))
-                    print(f"✅ Statistiques sauvegardées: {stats_file.name}")
-                    
-                elif isinstance(hdu, fits.ImageHDU) or isinstance(hdu, fits.PrimaryHDU):
-                    # C'est une image
-                    if hdu.data.size > 0:
-                        print(f"🖼️  Extension de type image")
-                        print(f"   Shape: {hdu.data.shape}")
-                        
-                        # Sauvegarder en numpy array
-                        npy_file = output_dir / f"{base_name}_{extension_name}_data.npy"
-                        np.save(npy_file, hdu.data)
-                        print(f"✅ Données numpy sauvegardées: {npy_file.name}")
-            else:
-                print(f"ℹ️  Pas de données dans cette extension (header seulement)")
-    
+                    stats_lines = [
+                        f"Statistiques de l'extension {extension_name}",
+                        "="*80,
+                        "",
+                        f"Nombre de lignes: {table.num_rows}",
+                        f"Colonnes: {', '.join(table.column_names)}",
+                        "",
+                        "Statistiques descriptives:",
+                        "-"*80,
+                    ]
+                    for col_name, col in zip(table.column_names, table.columns):
+                        if not (pa.types.is_integer(col.type)
+                                or pa.types.is_floating(col.type)):
+                            continue
+                        min_max = pc.min_max(col).as_py()
+                        stats_lines.append(
+                            f"{col_name:20s} min={min_max['min']} "
+                            f"max={min_max['max']} "
+                            f"mean={pc.mean(col).as_py()} "
+                            f"std={pc.stddev(col).as_py()} "
+                            f"nulls={col.null_count}"
+                        )
+                    stats_file.write_text("\n".join(stats_lines) + "\n",
+                                          encoding='utf-8')
+                    msgs.append(f"✅ Statistiques sauvegardées: {stats_file.name}")
+
+            elif is_image:
+                # C'est une image
+                msgs.append("🖼️  Extension de type image")
+                msgs.append(f"   Shape: {data.shape}")
+
+                # Sauvegarder en numpy array : open_memmap écrit directement
+                # dans le fichier mappé (copie unique, pas de buffer
+                # intermédiaire comme np.save)
+                npy_file = output_dir / f"{base_name}_{extension_name}_data.npy"
+                out = np.lib.format.open_memmap(
+                    npy_file, mode='w+', dtype=data.dtype, shape=data.shape)
+                np.copyto(out, data)
+                out.flush()
+                del out
+                msgs.append(f"✅ Données numpy sauvegardées: {npy_file.name}")
+        else:
+            msgs.append("ℹ️  Pas de données dans cette extension (header seulement)")
+        return msgs
+
+    # Deuxième passe parallèle : les extensions sont indépendantes, la
+    # compression zstd et les écritures disque se recouvrent. map() rend
+    # les résultats dans l'ordre, l'affichage reste lisible.
+    with ThreadPoolExecutor(max_workers=min(len(items), os.cpu_count() or 1)) as executor:
+        for msgs in executor.map(_process_extension, items):
+            print("\n".join(msgs))
+
+
+    # Lister les fichiers créés en UNE passe scandir (les DirEntry mettent
+    # le stat() en cache) : la liste sert au README puis au résumé console,
+    # au lieu de deux glob() + stat() séparés
+    created_files = sorted(
+        ((entry.name, entry.stat().st_size / (1024**2))
+         for entry in os.scandir(output_dir)
+         if entry.name.startswith(base_name)),
+    )
+
     # Créer un README récapitulatif
     readme_file = output_dir / f"{base_name}_README.txt"
     with open(readme_file, 'w') as f:
@@ -162,35 +314,36 @@ def extract_fits_content(fits_file: Path, output_dir: Path):
         f.write("="*80 + "\n\n")
         f.write("FICHIERS EXTRAITS:\n")
         f.write("-"*80 + "\n\n")
-        
-        # Lister tous les fichiers créés
-        for file in sorted(output_dir.glob(f"{base_name}*")):
-            size_mb = file.stat().st_size / (1024**2)
-            f.write(f"  • {file.name:60s} ({size_mb:6.2f} MB)\n")
-        
+
+        for name, size_mb in created_files:
+            f.write(f"  • {name:60s} ({size_mb:6.2f} MB)\n")
+
         f.write("\n\nDESCRIPTION DES FICHIERS:\n")
         f.write("-"*80 + "\n\n")
         f.write("*_structure.txt      : Structure générale du fichier FITS\n")
         f.write("*_header.txt         : Métadonnées brutes (format FITS)\n")
         f.write("*_header.json        : Métadonnées en JSON (plus facile à parser)\n")
-        f.write("*_data.csv           : Données de la courbe de lumière en CSV\n")
-        f.write("*_data.parquet       : Données en format Parquet (plus compact)\n")
+        f.write("*_data.parquet       : Données de la courbe de lumière (Parquet zstd)\n")
+        f.write("*_data.csv           : Données en CSV (uniquement avec --with-csv)\n")
         f.write("*_stats.txt          : Statistiques descriptives des données\n")
         f.write("*_README.txt         : Ce fichier\n")
-    
+
+    # Le README vient d'être écrit : l'ajouter à la liste déjà construite
+    created_files.append((readme_file.name, readme_file.stat().st_size / (1024**2)))
+    created_files.sort()
+
     print(f"\n{'='*80}")
     print(f"✅ EXTRACTION TERMINÉE!")
     print(f"{'='*80}")
     print(f"📁 Tous les fichiers ont été extraits dans: {output_dir.resolve()}")
     print(f"📄 Consultez {readme_file.name} pour un résumé complet")
-    
+
     # Afficher un résumé des fichiers créés
     print(f"\n📊 Fichiers créés:")
     total_size = 0
-    for file in sorted(output_dir.glob(f"{base_name}*")):
-        size_mb = file.stat().st_size / (1024**2)
+    for name, size_mb in created_files:
         total_size += size_mb
-        print(f"   • {file.name:60s} ({size_mb:6.2f} MB)")
+        print(f"   • {name:60s} ({size_mb:6.2f} MB)")
     print(f"\n💾 Taille totale: {total_size:.2f} MB")
 
 
@@ -201,14 +354,19 @@ def main():
     DEFAULT_FITS_FILE = "data/TESS/fits/tess2018206045859-s0001-0000000008195886-0120-s_lc.fits"
     DEFAULT_OUTPUT_DIR = "final"
     
-    # Vérifier les arguments de ligne de commande
-    if len(sys.argv) > 1:
-        fits_file = Path(sys.argv[1])
+    # Vérifier les arguments de ligne de commande (flags à part)
+    with_csv = '--with-csv' in sys.argv
+    write_stats = '--stats' in sys.argv
+    force = '--force' in sys.argv
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+
+    if len(args) > 0:
+        fits_file = Path(args[0])
     else:
         fits_file = Path(DEFAULT_FITS_FILE)
-    
-    if len(sys.argv) > 2:
-        output_dir = Path(sys.argv[2])
+
+    if len(args) > 1:
+        output_dir = Path(args[1])
     else:
         output_dir = Path(DEFAULT_OUTPUT_DIR)
     
@@ -222,7 +380,8 @@ def main():
     
     # Extraire le contenu
     try:
-        extract_fits_content(fits_file, output_dir)
+        extract_fits_content(fits_file, output_dir, with_csv=with_csv,
+                             write_stats=write_stats, force=force)
     except Exception as e:
         print(f"\n❌ Erreur lors de l'extraction: {e}")
         import traceback
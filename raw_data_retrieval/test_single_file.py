@@ -3,19 +3,23 @@ Script de test rapide pour un seul fichier FITS
 Utilisez ce script pour tester avant de traiter tous les fichiers
 """
 
-from get_csv_from_fits import process_single_fits, extract_tic_from_filename, extract_sector_from_filename
 from pathlib import Path
-import pandas as pd
 
 def test_single_file():
     # Trouver le premier fichier FITS
     fits_dir = Path("data/TESS/fits")
     fits_files = list(fits_dir.glob("*.fits"))
-    
+
     if not fits_files:
         print("❌ Aucun fichier FITS trouvé dans data/TESS/fits/")
         return
-    
+
+    # Import différé : get_csv_from_fits tire pandas/pyarrow/astropy, que
+    # le chemin "aucun FITS trouvé" ci-dessus n'a pas besoin de payer
+    from get_csv_from_fits import (process_single_fits,
+                                   extract_tic_from_filename,
+                                   extract_sector_from_filename)
+
     # Prendre le premier fichier
     test_file = fits_files[0]
     output_dir = Path("test_final")
@@ -38,14 +42,15 @@ def test_single_file():
     print(f"\n📊 Résultat:")
     if result['status'] == 'success':
         print(f"   ✅ Statut: {result['status']}")
-        print(f"   📄 Fichier CSV: {result['output']}")
+        print(f"   📄 Fichier Parquet: {result['output']}")
         print(f"   🎯 TIC: {result['tic']}")
         print(f"   📡 Secteur: {result['sector']}")
         print(f"   📏 Nombre de lignes: {result['rows']}")
-        
-        # Charger et afficher le CSV
-        df = pd.read_csv(result['output'])
-        print(f"\n📋 Aperçu du CSV généré:")
+
+        # DataFrame déjà retourné par process_single_fits : pas besoin de
+        # relire le Parquet qui vient d'être écrit
+        df = result['dataframe']
+        print(f"\n📋 Aperçu du Parquet généré:")
         print(f"   • Colonnes: {list(df.columns)}")
         print(f"   • Shape: {df.shape}")
         print(f"   • Dernières colonnes: {list(df.columns[-3:])}")
@@ -63,7 +68,7 @@ def test_single_file():
         
     elif result['status'] == 'skipped':
         print(f"   ⏭️  Statut: fichier déjà existant")
-        print(f"   📄 Fichier CSV: {result['output']}")
+        print(f"   📄 Fichier Parquet: {result['output']}")
         
     else:
         print(f"   ❌ Statut: {result['status']}")